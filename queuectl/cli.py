@@ -3,11 +3,54 @@
 import click
 import json
 import sys
+from functools import lru_cache
 from queuectl.storage import Storage
 from queuectl.models import Job, JobState
 from queuectl.config import Config
-from queuectl.worker import WorkerManager
-from queuectl.dashboard import run_dashboard
+from queuectl.jsonutil import loads, dumps
+
+# Maps accepted --state values to their shared JobState constants
+_STATES = {state: state for state in JobState.ALL}
+
+# Table and report rules, built once at import
+_STATUS_RULE = "=" * 50 + "\n"
+_LIST_RULE = "-" * 100 + "\n"
+_DLQ_RULE = "-" * 110 + "\n"
+
+# Config keys are shown with hyphens but stored with underscores
+_TO_INTERNAL = str.maketrans('-', '_')
+_TO_EXTERNAL = str.maketrans('_', '-')
+
+
+@lru_cache(maxsize=1)
+def _get_storage() -> Storage:
+    """Get the process-wide storage instance"""
+    return Storage()
+
+
+@lru_cache(maxsize=1)
+def _get_config() -> Config:
+    """Get the process-wide configuration instance"""
+    return Config()
+
+
+def _write_text(text: str):
+    """Encode text once and write it to stdout in a single call"""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(text.encode(sys.stdout.encoding or 'utf-8', 'replace'))
+    sys.stdout.buffer.flush()
+
+
+def _write_json_array(jobs):
+    """Stream jobs to stdout as a JSON array, one object per line"""
+    out = sys.stdout.buffer
+    out.write(b'[')
+    separator = b'\n'
+    for job in jobs:
+        out.write(separator)
+        out.write(dumps(job.to_dict()))
+        separator = b',\n'
+    out.write(b'\n]\n')
 
 
 @click.group()
@@ -27,7 +70,7 @@ def enqueue(job_data):
     Example: queuectl enqueue '{"id":"job1","command":"sleep 2"}'
     """
     try:
-        data = json.loads(job_data)
+        data = loads(job_data)
         
         # Validate required fields
         if 'id' not in data or 'command' not in data:
@@ -35,14 +78,10 @@ def enqueue(job_data):
             sys.exit(1)
         
         # Create job
-        job = Job(
-            id=data['id'],
-            command=data['command'],
-            max_retries=data.get('max_retries', 3)
-        )
+        job = Job(data['id'], data['command'], JobState.PENDING, 0, data.get('max_retries', 3))
         
         # Add to storage
-        storage = Storage()
+        storage = _get_storage()
         if storage.add_job(job):
             click.echo(f"Job '{job.id}' enqueued successfully")
             click.echo(f"Command: {job.command}")
@@ -59,6 +98,48 @@ def enqueue(job_data):
         sys.exit(1)
 
 
+@main.command('enqueue-batch')
+@click.option('--file', '-f', 'source', type=click.File('rb'), default='-',
+              help='File with a JSON array or NDJSON jobs (default: stdin)')
+def enqueue_batch(source):
+    """Enqueue many jobs at once from a JSON array or NDJSON stream
+    
+    Example: queuectl enqueue-batch --file jobs.ndjson
+    """
+    try:
+        raw = source.read()
+        stripped = raw.lstrip()
+        
+        if stripped.startswith(b'['):
+            items = loads(stripped)
+        else:
+            items = [loads(line) for line in stripped.splitlines() if line.strip()]
+        
+        # Validate required fields
+        for data in items:
+            if not isinstance(data, dict) or 'id' not in data or 'command' not in data:
+                click.echo("Error: Job must have 'id' and 'command' fields", err=True)
+                sys.exit(1)
+        
+        jobs = [
+            Job(data['id'], data['command'], JobState.PENDING, 0, data.get('max_retries', 3))
+            for data in items
+        ]
+        
+        storage = _get_storage()
+        added = storage.add_jobs(jobs)
+        click.echo(f"Enqueued {added} job(s)")
+        if added < len(jobs):
+            click.echo(f"Skipped {len(jobs) - added} job(s) with existing IDs", err=True)
+    
+    except json.JSONDecodeError:
+        click.echo("Error: Invalid JSON format", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
 @main.group()
 def worker():
     """Worker management commands"""
@@ -69,8 +150,9 @@ def worker():
 @click.option('--count', '-c', type=int, default=None, help='Number of workers to start')
 def worker_start(count):
     """Start one or more worker processes"""
-    storage = Storage()
-    config = Config()
+    from queuectl.worker import WorkerManager
+    storage = _get_storage()
+    config = _get_config()
     
     if count is not None:
         config.set("worker_count", count)
@@ -82,8 +164,9 @@ def worker_start(count):
 @worker.command('stop')
 def worker_stop():
     """Stop all running workers gracefully"""
-    storage = Storage()
-    config = Config()
+    from queuectl.worker import WorkerManager
+    storage = _get_storage()
+    config = _get_config()
     manager = WorkerManager(storage, config)
     manager.stop_workers()
 
@@ -91,64 +174,71 @@ def worker_stop():
 @main.command()
 def status():
     """Show summary of all job states and active workers"""
-    storage = Storage()
-    config = Config()
-    manager = WorkerManager(storage, config)
+    from queuectl.worker import worker_is_running
+    storage = _get_storage()
     
     stats = storage.get_stats()
     
-    click.echo("=" * 50)
-    click.echo("QueueCTL Status")
-    click.echo("=" * 50)
-    click.echo()
-    click.echo("Job Statistics:")
-    click.echo(f"  Pending:   {stats.get(JobState.PENDING, 0)}")
-    click.echo(f"  Processing: {stats.get(JobState.PROCESSING, 0)}")
-    click.echo(f"  Completed: {stats.get(JobState.COMPLETED, 0)}")
-    click.echo(f"  Failed:    {stats.get(JobState.FAILED, 0)}")
-    click.echo(f"  Dead (DLQ): {stats.get(JobState.DEAD, 0)}")
-    click.echo()
-    
     total = sum(stats.values())
-    click.echo(f"Total Jobs: {total}")
-    click.echo()
+    workers = "Running" if worker_is_running() else "Stopped"
     
-    # Check worker status
-    if manager.is_running():
-        click.echo("Workers: Running")
-    else:
-        click.echo("Workers: Stopped")
-    click.echo()
+    # Build the whole report up front and write it once
+    click.echo(
+        f"{_STATUS_RULE}"
+        f"QueueCTL Status\n"
+        f"{_STATUS_RULE}"
+        f"\n"
+        f"Job Statistics:\n"
+        f"  Pending:   {stats.get(JobState.PENDING, 0)}\n"
+        f"  Processing: {stats.get(JobState.PROCESSING, 0)}\n"
+        f"  Completed: {stats.get(JobState.COMPLETED, 0)}\n"
+        f"  Failed:    {stats.get(JobState.FAILED, 0)}\n"
+        f"  Dead (DLQ): {stats.get(JobState.DEAD, 0)}\n"
+        f"\n"
+        f"Total Jobs: {total}\n"
+        f"\n"
+        f"Workers: {workers}\n"
+    )
 
 
 @main.command('list')
-@click.option('--state', '-s', type=click.Choice(['pending', 'processing', 'completed', 'failed', 'dead']), 
-              help='Filter jobs by state')
+@click.option('--state', '-s', type=str,
+              help='Filter jobs by state (pending, processing, completed, failed, dead)')
 @click.option('--format', '-f', type=click.Choice(['table', 'json']), default='table',
               help='Output format')
-def list_jobs(state, format):
+@click.option('--limit', '-n', type=click.IntRange(min=0), default=None,
+              help='Maximum number of jobs to show')
+def list_jobs(state, format, limit):
     """List jobs, optionally filtered by state"""
-    storage = Storage()
+    if state is not None and state not in _STATES:
+        raise click.BadParameter(f"'{state}' is not one of {', '.join(_STATES)}.",
+                                 param_hint="'--state'")
     
-    if state:
-        jobs = storage.get_jobs_by_state(state)
-    else:
-        jobs = storage.get_all_jobs()
+    storage = _get_storage()
+    state = _STATES[state] if state else None
     
     if format == 'json':
-        jobs_data = [job.to_dict() for job in jobs]
-        click.echo(json.dumps(jobs_data, indent=2))
+        # Stream rows straight from the cursor; JSON needs no empty check or widths
+        _write_json_array(storage.iter_jobs(state=state, limit=limit))
     else:
+        if state:
+            jobs = storage.get_jobs_by_state(state, limit=limit)
+        else:
+            jobs = storage.get_all_jobs(limit=limit)
+        
         if not jobs:
             click.echo("No jobs found")
             return
         
-        click.echo(f"{'ID':<20} {'State':<12} {'Command':<30} {'Attempts':<10} {'Created At':<20}")
-        click.echo("-" * 100)
-        
-        for job in jobs:
-            created = job.created_at[:19] if job.created_at else "N/A"
-            click.echo(f"{job.id:<20} {job.state:<12} {job.command[:28]:<30} {job.attempts}/{job.max_retries:<10} {created:<20}")
+        # Bind the row formatter once and emit the whole table in one write
+        fmt = "{:<20} {:<12} {:<30.28} {:<10} {:<20.19}\n".format
+        rows = [fmt('ID', 'State', 'Command', 'Attempts', 'Created At'), _LIST_RULE]
+        rows += [
+            fmt(job.id, job.state, job.command, f"{job.attempts}/{job.max_retries}",
+                job.created_at or "N/A")
+            for job in jobs
+        ]
+        _write_text(''.join(rows))
 
 
 @main.group()
@@ -160,34 +250,38 @@ def dlq():
 @dlq.command('list')
 @click.option('--format', '-f', type=click.Choice(['table', 'json']), default='table',
               help='Output format')
-def dlq_list(format):
+@click.option('--limit', '-n', type=click.IntRange(min=0), default=None,
+              help='Maximum number of jobs to show')
+def dlq_list(format, limit):
     """List all jobs in the Dead Letter Queue"""
-    storage = Storage()
-    jobs = storage.get_jobs_by_state(JobState.DEAD)
+    storage = _get_storage()
     
     if format == 'json':
-        jobs_data = [job.to_dict() for job in jobs]
-        click.echo(json.dumps(jobs_data, indent=2))
+        _write_json_array(storage.iter_jobs(state=JobState.DEAD, limit=limit))
     else:
+        jobs = storage.get_jobs_by_state(JobState.DEAD, limit=limit)
+        
         if not jobs:
             click.echo("Dead Letter Queue is empty")
             return
         
         click.echo(f"Dead Letter Queue ({len(jobs)} jobs):")
         click.echo()
-        click.echo(f"{'ID':<20} {'Command':<40} {'Attempts':<15} {'Error':<30}")
-        click.echo("-" * 110)
-        
-        for job in jobs:
-            error = (job.error_message or "N/A")[:28] if job.error_message else "N/A"
-            click.echo(f"{job.id:<20} {job.command[:38]:<40} {job.attempts}/{job.max_retries:<15} {error:<30}")
+        fmt = "{:<20} {:<40.38} {:<15} {:<30.28}\n".format
+        rows = [fmt('ID', 'Command', 'Attempts', 'Error'), _DLQ_RULE]
+        rows += [
+            fmt(job.id, job.command, f"{job.attempts}/{job.max_retries}",
+                job.error_message or "N/A")
+            for job in jobs
+        ]
+        _write_text(''.join(rows))
 
 
 @dlq.command('retry')
 @click.argument('job_id', type=str)
 def dlq_retry(job_id):
     """Retry a job from the Dead Letter Queue"""
-    storage = Storage()
+    storage = _get_storage()
     job = storage.get_job(job_id)
     
     if not job:
@@ -222,11 +316,11 @@ def config():
 @click.argument('key', type=str, required=False)
 def config_get(key):
     """Get configuration value(s)"""
-    config = Config()
+    config = _get_config()
     
     if key:
         # Convert hyphen to underscore for internal keys
-        internal_key = key.replace('-', '_')
+        internal_key = key.translate(_TO_INTERNAL)
         value = config.get(internal_key)
         if value is None:
             click.echo(f"Error: Unknown config key '{key}'", err=True)
@@ -238,7 +332,7 @@ def config_get(key):
         click.echo("Configuration:")
         for k, v in all_config.items():
             # Convert underscore to hyphen for display
-            display_key = k.replace('_', '-')
+            display_key = k.translate(_TO_EXTERNAL)
             click.echo(f"  {display_key} = {v}")
 
 
@@ -253,11 +347,11 @@ def config_set(key, value):
       backoff-base: Base for exponential backoff (float)
       worker-count: Default number of workers (integer)
     """
-    config = Config()
+    config = _get_config()
     
     try:
         # Convert hyphen to underscore for internal keys
-        internal_key = key.replace('-', '_')
+        internal_key = key.translate(_TO_INTERNAL)
         config.set(internal_key, value)
         click.echo(f"Set {key} = {value}")
     except ValueError as e:
@@ -272,14 +366,22 @@ def config_set(key, value):
 @click.option('--host', default='127.0.0.1', help='Host to bind to (default: 127.0.0.1)')
 @click.option('--port', default=5000, type=int, help='Port to bind to (default: 5000)')
 @click.option('--debug', is_flag=True, help='Enable debug mode')
-def dashboard(host, port, debug):
+@click.option('--reload', 'use_reloader', is_flag=True, help='Restart on code changes (debug mode)')
+@click.option('--threads', default=8, type=click.IntRange(min=1),
+              help='Request threads when served by waitress; live updates use at most '
+                   'threads - 1 of them, extra browser tabs poll instead (default: 8)')
+def dashboard(host, port, debug, use_reloader, threads):
     """Start the web dashboard
     
     Opens a web interface to monitor jobs, workers, and system status.
     Access the dashboard at http://host:port
     """
+    # Flask is only needed here, so keep it out of the startup path
+    from queuectl.dashboard import run_dashboard
+    
     try:
-        run_dashboard(host=host, port=port, debug=debug)
+        run_dashboard(host=host, port=port, debug=debug, use_reloader=use_reloader,
+                      threads=threads)
     except KeyboardInterrupt:
         click.echo("\nDashboard stopped")
     except Exception as e:
@@ -2,8 +2,26 @@
 
 import json
 import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any
+from queuectl.jsonutil import loads, dumps
+
+
+def _non_negative_int(key: str, value: Any) -> int:
+    """Validate a non-negative integer setting"""
+    value = int(value)
+    if value < 0:
+        raise ValueError(f"{key} must be non-negative")
+    return value
+
+
+def _positive_float(key: str, value: Any) -> float:
+    """Validate a positive float setting"""
+    value = float(value)
+    if value <= 0:
+        raise ValueError(f"{key} must be positive")
+    return value
 
 
 class Config:
@@ -15,6 +33,13 @@ class Config:
         "worker_count": 1,
     }
 
+    # Per-key type validation, looked up once per set()
+    _VALIDATORS: Dict[str, Callable[[str, Any], Any]] = {
+        "max_retries": _non_negative_int,
+        "backoff_base": _positive_float,
+        "worker_count": _non_negative_int,
+    }
+
     def __init__(self, config_dir: str = None):
         """Initialize configuration"""
         if config_dir is None:
@@ -23,55 +48,86 @@ class Config:
             config_dir = str(home / ".queuectl")
         
         self.config_dir = Path(config_dir)
-        self.config_dir.mkdir(parents=True, exist_ok=True)
+        if not self.config_dir.exists():
+            self.config_dir.mkdir(parents=True, exist_ok=True)
         self.config_file = self.config_dir / "config.json"
-        self._config = self._load_config()
+        # Parsed on first access so commands that never read config skip the I/O
+        self._config = None
+        self._dirty = False
+        self._batch_depth = 0
+
+    @property
+    def _cfg(self) -> Dict[str, Any]:
+        """Get the loaded configuration, reading the file on first use"""
+        if self._config is None:
+            self._config = self._load_config()
+        return self._config
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file"""
-        if self.config_file.exists():
-            try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    merged = self.DEFAULT_CONFIG.copy()
-                    merged.update(config)
-                    return merged
-            except (json.JSONDecodeError, IOError):
-                return self.DEFAULT_CONFIG.copy()
-        return self.DEFAULT_CONFIG.copy()
+        # A missing file raises IOError, so no separate exists() check is needed
+        try:
+            with open(self.config_file, 'rb') as f:
+                data = f.read()
+        except IOError:
+            return self.DEFAULT_CONFIG.copy()
+        
+        try:
+            config = loads(data)
+        except json.JSONDecodeError:
+            return self.DEFAULT_CONFIG.copy()
+        
+        # Merge with defaults to ensure all keys exist
+        merged = self.DEFAULT_CONFIG.copy()
+        merged.update(config)
+        return merged
 
     def _save_config(self):
-        """Save configuration to file"""
+        """Save configuration to file atomically"""
+        tmp_file = self.config_file.with_name(self.config_file.name + ".tmp")
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self._config, f, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(dumps(self._cfg, indent=True))
+            os.replace(tmp_file, self.config_file)
+            self._dirty = False
         except IOError as e:
             raise RuntimeError(f"Failed to save config: {e}")
 
+    @contextmanager
+    def batch(self):
+        """Defer saving until the outermost batch exits"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._save_config()
+
     def get(self, key: str, default=None):
         """Get configuration value"""
-        return self._config.get(key, default)
+        return self._cfg.get(key, default)
 
     def set(self, key: str, value: Any):
         """Set configuration value"""
         if key not in self.DEFAULT_CONFIG:
             raise ValueError(f"Unknown config key: {key}")
         
-        # Type validation
-        if key == "max_retries" or key == "worker_count":
-            value = int(value)
-            if value < 0:
-                raise ValueError(f"{key} must be non-negative")
-        elif key == "backoff_base":
-            value = float(value)
-            if value <= 0:
-                raise ValueError(f"backoff_base must be positive")
+        validator = self._VALIDATORS.get(key)
+        if validator is not None:
+            value = validator(key, value)
+        
+        # Skip the rewrite when the value is already in effect
+        config = self._cfg
+        if key in config and config[key] == value:
+            return
         
-        self._config[key] = value
-        self._save_config()
+        config[key] = value
+        self._dirty = True
+        if self._batch_depth == 0:
+            self._save_config()
 
     def get_all(self) -> Dict[str, Any]:
         """Get all configuration values"""
-        return self._config.copy()
+        return self._cfg.copy()
 
@@ -1,12 +1,17 @@
 """Enhanced Web Dashboard for QueueCTL with Auto-Update"""
 
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, abort, request
 from queuectl.storage import Storage
 from queuectl.models import JobState
-from queuectl.config import Config
-from queuectl.worker import WorkerManager
+from queuectl.jsonutil import dumps
+from queuectl.worker import worker_is_running
 import json
+import gzip
+import hashlib
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 import os
 
 app = Flask(__name__)
@@ -531,12 +536,36 @@ ENHANCED_TEMPLATE = '''
             <div class="last-updated" id="lastUpdated"></div>
         </div>
     </div>
+    
+    <template id="jobTemplate">
+        <div class="job-item">
+            <div class="job-header">
+                <div class="job-id"></div>
+                <div class="job-state"></div>
+            </div>
+            <div class="job-command"></div>
+            <div class="job-footer">
+                <div class="job-attempts"></div>
+                <div class="job-created"></div>
+            </div>
+            <div class="job-error"></div>
+        </div>
+    </template>
 
     <script>
-        let autoUpdateInterval = null;
+        const UPDATE_INTERVAL = 5000;
+        const MAX_RETRY_DELAY = 60000;
+        const RELATIVE_TIME = new Intl.RelativeTimeFormat(undefined, {numeric: 'auto', style: 'narrow'});
+        
+        let pollTimer = null;
+        let reconnectTimer = null;
+        let eventSource = null;
+        let retryDelay = UPDATE_INTERVAL;
+        let streamRetryDelay = UPDATE_INTERVAL;
         let currentFilter = 'all';
         let isAutoUpdateEnabled = true;
         let lastUpdateTime = null;
+        let renderedJobs = new Map();
         
         function init() {
             setupEventListeners();
@@ -553,10 +582,15 @@ ENHANCED_TEMPLATE = '''
                 });
             });
             
-            // Refresh on visibility change
+            // Stop updating while the tab is hidden and catch up when it returns
             document.addEventListener('visibilitychange', function() {
-                if (!document.hidden && isAutoUpdateEnabled) {
-                    refreshData();
+                if (document.hidden) {
+                    stopAutoUpdate();
+                } else if (isAutoUpdateEnabled) {
+                    startAutoUpdate();
+                    if (!eventSource) {
+                        refreshData();
+                    }
                 }
             });
         }
@@ -569,8 +603,12 @@ ENHANCED_TEMPLATE = '''
                 btn.classList.toggle('active', btn.dataset.state === state);
             });
             
-            // Reload jobs with filter
-            loadJobs();
+            // Fetch the filtered jobs, reopening the stream if one is active
+            if (eventSource) {
+                startAutoUpdate();
+            } else {
+                refreshData();
+            }
         }
         
         function clearFilters() {
@@ -594,25 +632,77 @@ ENHANCED_TEMPLATE = '''
         }
         
         function startAutoUpdate() {
-            stopAutoUpdate(); // Clear existing interval
-            if (isAutoUpdateEnabled) {
-                autoUpdateInterval = setInterval(refreshData, 5000); // Update every 5 seconds
+            stopAutoUpdate(); // Clear existing stream or timers
+            if (!isAutoUpdateEnabled || document.hidden) {
+                return;
             }
+            
+            if (window.EventSource) {
+                // Server pushes a snapshot whenever the queue changes
+                eventSource = new EventSource('/api/stream?' + jobsQuery());
+                eventSource.onmessage = function(event) {
+                    const data = JSON.parse(event.data);
+                    updateStats(data.stats);
+                    displayJobs(data.jobs || []);
+                    streamRetryDelay = UPDATE_INTERVAL;
+                    noteSuccess();
+                };
+                eventSource.onerror = function() {
+                    // The server is down or has no free stream slot; poll until
+                    // a stream can be reopened, retrying it with backoff
+                    stopAutoUpdate();
+                    streamRetryDelay = Math.min(streamRetryDelay * 2, MAX_RETRY_DELAY);
+                    reconnectTimer = setTimeout(startAutoUpdate, streamRetryDelay);
+                    schedulePoll();
+                };
+            } else {
+                schedulePoll();
+            }
+        }
+        
+        function schedulePoll() {
+            if (pollTimer !== null) {
+                clearTimeout(pollTimer);
+            }
+            pollTimer = setTimeout(function() {
+                loadDashboard().then(function() {
+                    if (pollTimer !== null) {
+                        schedulePoll();
+                    }
+                });
+            }, retryDelay);
         }
         
         function stopAutoUpdate() {
-            if (autoUpdateInterval) {
-                clearInterval(autoUpdateInterval);
-                autoUpdateInterval = null;
+            if (pollTimer !== null) {
+                clearTimeout(pollTimer);
+                pollTimer = null;
+            }
+            if (reconnectTimer !== null) {
+                clearTimeout(reconnectTimer);
+                reconnectTimer = null;
+            }
+            if (eventSource) {
+                eventSource.close();
+                eventSource = null;
             }
         }
         
-        function refreshData() {
-            loadStats();
-            loadJobs();
+        function noteSuccess() {
+            retryDelay = UPDATE_INTERVAL;
             updateConnectionStatus(true);
         }
         
+        function noteFailure() {
+            // Double the wait after each failure, up to a minute
+            retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+            updateConnectionStatus(false);
+        }
+        
+        function refreshData() {
+            loadDashboard();
+        }
+        
         function updateConnectionStatus(connected) {
             const indicator = document.getElementById('connectionStatus');
             const text = document.getElementById('connectionText');
@@ -626,21 +716,33 @@ ENHANCED_TEMPLATE = '''
             }
         }
         
-        function loadStats() {
-            fetch('/api/status')
+        function jobsQuery() {
+            // The server filters, sorts and limits to the 20 most recent jobs
+            const params = new URLSearchParams({limit: 20, order: '-created_at'});
+            if (currentFilter !== 'all') {
+                params.set('state', currentFilter);
+            }
+            return params.toString();
+        }
+        
+        function loadDashboard() {
+            return fetch('/api/dashboard?' + jobsQuery())
                 .then(response => {
                     if (!response.ok) throw new Error('Network response was not ok');
                     return response.json();
                 })
                 .then(data => {
                     updateStats(data.stats);
-                    updateConnectionStatus(true);
+                    displayJobs(data.jobs || []);
+                    noteSuccess();
                 })
                 .catch(error => {
-                    console.error('Error loading stats:', error);
-                    updateConnectionStatus(false);
+                    console.error('Error loading dashboard:', error);
+                    noteFailure();
                     document.getElementById('statsContainer').innerHTML = 
                         '<div class="stat-card"><div class="stat-number">⚠️</div><div class="stat-label">Connection Error</div></div>';
+                    document.getElementById('jobsContainer').innerHTML = 
+                        '<div class="no-jobs">❌ Error loading jobs. Check connection.</div>';
                 });
         }
         
@@ -656,91 +758,85 @@ ENHANCED_TEMPLATE = '''
             `).join('');
         }
         
-        function loadJobs() {
-            fetch('/api/jobs')
-                .then(response => {
-                    if (!response.ok) throw new Error('Network response was not ok');
-                    return response.json();
-                })
-                .then(data => {
-                    displayJobs(data.jobs || []);
-                    updateConnectionStatus(true);
-                })
-                .catch(error => {
-                    console.error('Error loading jobs:', error);
-                    updateConnectionStatus(false);
-                    document.getElementById('jobsContainer').innerHTML = 
-                        '<div class="no-jobs">❌ Error loading jobs. Check connection.</div>';
-                });
+        function jobKey(job) {
+            // Rows are rebuilt only when one of these fields changes
+            return [job.state, job.command, job.attempts, job.max_retries, job.error_message].join('|');
         }
         
-        function displayJobs(jobs) {
-            const container = document.getElementById('jobsContainer');
+        function buildJobNode(job) {
+            const node = document.getElementById('jobTemplate').content.firstElementChild.cloneNode(true);
+            node.classList.add(job.state);
+            node.querySelector('.job-id').textContent = job.id;
             
-            // Filter jobs based on current filter
-            let filteredJobs = jobs;
-            if (currentFilter !== 'all') {
-                filteredJobs = jobs.filter(job => job.state === currentFilter);
-            }
+            const state = node.querySelector('.job-state');
+            state.classList.add(`state-${job.state}`);
+            state.textContent = job.state;
             
-            // Sort by created_at (newest first)
-            filteredJobs.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+            node.querySelector('.job-command').textContent = job.command;
+            node.querySelector('.job-attempts').textContent = `Attempts: ${job.attempts}/${job.max_retries}`;
             
-            // Show only the 20 most recent jobs
-            const recentJobs = filteredJobs.slice(0, 20);
+            const error = node.querySelector('.job-error');
+            if (job.error_message) {
+                error.textContent = job.error_message;
+            } else {
+                error.remove();
+            }
+            return node;
+        }
+        
+        function displayJobs(jobs) {
+            const container = document.getElementById('jobsContainer');
             
-            if (recentJobs.length === 0) {
+            // Jobs arrive already filtered, newest first and limited
+            if (jobs.length === 0) {
+                renderedJobs = new Map();
                 container.innerHTML = `<div class="no-jobs">No ${currentFilter === 'all' ? '' : currentFilter} jobs found</div>`;
                 return;
             }
             
-            container.innerHTML = recentJobs.map(job => `
-                <div class="job-item ${job.state}">
-                    <div class="job-header">
-                        <div class="job-id">${escapeHtml(job.id)}</div>
-                        <div class="job-state state-${job.state}">${job.state}</div>
-                    </div>
-                    <div class="job-command">${escapeHtml(job.command)}</div>
-                    <div class="job-footer">
-                        <div class="job-attempts">Attempts: ${job.attempts}/${job.max_retries}</div>
-                        <div>Created: ${formatDate(job.created_at)}</div>
-                    </div>
-                    ${job.error ? `<div class="job-error">${escapeHtml(job.error)}</div>` : ''}
-                </div>
-            `).join('');
+            // Reuse unchanged rows and clone the template for the rest
+            const now = Date.now();
+            const fragment = document.createDocumentFragment();
+            const nextJobs = new Map();
+            jobs.forEach(job => {
+                const key = jobKey(job);
+                let entry = renderedJobs.get(job.id);
+                if (!entry || entry.key !== key) {
+                    entry = {key: key, node: buildJobNode(job)};
+                }
+                // Relative times drift, so refresh them on every render
+                entry.node.querySelector('.job-created').textContent = `Created: ${formatDate(job.created_at, now)}`;
+                nextJobs.set(job.id, entry);
+                fragment.appendChild(entry.node);
+            });
+            renderedJobs = nextJobs;
+            container.replaceChildren(fragment);
             
-            lastUpdateTime = new Date();
-            updateLastUpdated();
+            lastUpdateTime = now;
+            updateLastUpdated(now);
         }
         
-        function formatDate(dateString) {
-            const date = new Date(dateString);
-            const now = new Date();
-            const diffMs = now - date;
+        function formatDate(value, nowMs) {
+            // Callers read the clock once per render and pass it in
+            const timeMs = typeof value === 'number' ? value : Date.parse(value);
+            const diffMs = nowMs - timeMs;
             const diffMins = Math.floor(diffMs / 60000);
             const diffHours = Math.floor(diffMs / 3600000);
             const diffDays = Math.floor(diffMs / 86400000);
             
             if (diffMins < 1) return 'Just now';
-            if (diffMins < 60) return `${diffMins}m ago`;
-            if (diffHours < 24) return `${diffHours}h ago`;
-            return `${diffDays}d ago`;
+            if (diffMins < 60) return RELATIVE_TIME.format(-diffMins, 'minute');
+            if (diffHours < 24) return RELATIVE_TIME.format(-diffHours, 'hour');
+            return RELATIVE_TIME.format(-diffDays, 'day');
         }
         
-        function updateLastUpdated() {
+        function updateLastUpdated(nowMs) {
             const element = document.getElementById('lastUpdated');
             if (lastUpdateTime) {
-                element.innerHTML = `Last updated: ${formatDate(lastUpdateTime.toISOString())} <span class="update-indicator"></span>`;
+                element.innerHTML = `Last updated: ${formatDate(lastUpdateTime, nowMs)} <span class="update-indicator"></span>`;
             }
         }
         
-        function escapeHtml(text) {
-            if (!text) return '';
-            const div = document.createElement('div');
-            div.textContent = text;
-            return div.innerHTML;
-        }
-        
         // Initialize dashboard
         init();
         
@@ -753,28 +849,74 @@ ENHANCED_TEMPLATE = '''
 </html>
 '''
 
+# The page has no server-side variables, so encode, compress and tag it once
+_INDEX_HTML = ENHANCED_TEMPLATE.encode('utf-8')
+_INDEX_HTML_GZ = gzip.compress(_INDEX_HTML, 9)
+_INDEX_ETAG = hashlib.sha1(_INDEX_HTML).hexdigest()
+_INDEX_ETAG_GZ = _INDEX_ETAG + "-gz"
+
 
 @app.route('/')
 def index():
     """Main dashboard page - returns enhanced HTML"""
-    return render_template_string(ENHANCED_TEMPLATE)
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = _INDEX_ETAG_GZ if use_gzip else _INDEX_ETAG
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(_INDEX_HTML_GZ, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(_INDEX_HTML, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=300, must-revalidate'
+    return response
 
 
-@app.route('/api/status')
-def api_status():
-    """Get system status with enhanced statistics"""
-    storage = Storage()
+@lru_cache(maxsize=1)
+def _get_storage() -> Storage:
+    """Get the storage instance shared by all requests"""
+    return Storage()
+
+
+# Polling clients share one computation per payload and TTL window
+_CACHE_TTL = 2.0
+_cache = {}
+# Bounds concurrent event streams so they cannot occupy every server thread
+_stream_slots = None
+_cache_lock = threading.Lock()
+
+
+def _cached(key, compute) -> dict:
+    """Get a payload from the short-lived cache, computing it when stale"""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return dict(entry[1])
     
+    payload = compute()
+    with _cache_lock:
+        now = time.monotonic()
+        # Drop expired entries so arbitrary query strings cannot grow the cache
+        for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[stale]
+        _cache[key] = (now + _CACHE_TTL, payload)
+    return dict(payload)
+
+
+def _status_payload(storage: Storage) -> dict:
+    """Get the status payload, reusing a recent computation if still fresh"""
+    return _cached('status', lambda: _compute_status(storage))
+
+
+def _compute_status(storage: Storage) -> dict:
+    """Build the status payload shared by the API and the event stream"""
     stats = storage.get_stats()
     
-    # Enhanced worker detection - check if worker processes are actually running
-    workers_running = False
-    try:
-        worker_manager = WorkerManager()
-        workers_running = worker_manager.is_running()
-    except:
-        # Fallback to processing jobs check
-        workers_running = stats.get('processing', 0) > 0
+    # Check the worker PID file directly; fall back to processing jobs
+    workers_running = worker_is_running() or stats.get(JobState.PROCESSING, 0) > 0
     
     # Add system information
     system_info = {
@@ -783,36 +925,155 @@ def api_status():
         'version': '1.0.0'
     }
     
-    return jsonify({
+    return {
         'stats': stats,
         'workers_running': workers_running,
         'system': system_info
-    })
+    }
+
+
+def _job_query_args() -> dict:
+    """Parse the state/limit/order query parameters for job listings"""
+    state = request.args.get('state') or None
+    if state is not None and state not in JobState.ALL:
+        abort(400, description=f"Unknown state: {state}")
+    
+    # type=int would quietly turn a bad value into None, i.e. no limit at all
+    limit = request.args.get('limit') or None
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            abort(400, description=f"limit must be an integer: {limit}")
+        if limit < 0:
+            abort(400, description="limit must be non-negative")
+    
+    order = request.args.get('order', 'created_at')
+    if order not in ('created_at', '-created_at'):
+        abort(400, description=f"Unsupported order: {order}")
+    
+    return {'state': state, 'limit': limit, 'newest_first': order == '-created_at'}
+
+
+def _job_dict(job) -> dict:
+    """Convert a job to a dictionary with display fields"""
+    job_dict = job.to_dict()
+    # Add computed fields for better display
+    job_dict['should_move_to_dlq'] = job.should_move_to_dlq()
+    job_dict['next_retry_in'] = job.get_next_retry_delay() if job.state == JobState.FAILED else None
+    return job_dict
+
+
+def _jobs_payload(storage: Storage, state=None, limit=None, newest_first=False) -> dict:
+    """Build the jobs payload shared by the API and the event stream"""
+    jobs = storage.iter_jobs(state=state, limit=limit, newest_first=newest_first)
+    return {'jobs': [_job_dict(job) for job in jobs]}
+
+
+def _json_response(payload: dict) -> Response:
+    """Encode a small payload once into a fixed-length, uncacheable response"""
+    # A bytes body gets an exact Content-Length, so keep-alive clients never
+    # wait on chunked framing; Connection is hop-by-hop and left to the server
+    response = Response(dumps(payload), mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/status')
+def api_status():
+    """Get system status with enhanced statistics"""
+    return _json_response(_status_payload(_get_storage()))
 
 
 @app.route('/api/jobs')
 def api_jobs():
     """Get all jobs with enhanced data"""
-    storage = Storage()
-    jobs = storage.get_all_jobs()
+    query = _job_query_args()
+    storage = _get_storage()
+    
+    def generate():
+        # Encode one job at a time so large queues are never held in memory
+        yield b'{"jobs":['
+        separator = b''
+        for job in storage.iter_jobs(**query):
+            yield separator + dumps(_job_dict(job))
+            separator = b','
+        yield b']}\n'
+    
+    return Response(generate(), mimetype='application/json')
+
+
+@app.route('/api/dashboard')
+def api_dashboard():
+    """Get status and jobs together in one response"""
+    query = _job_query_args()
+    storage = _get_storage()
+    payload = _status_payload(storage)
+    payload.update(_cached(('jobs', *query.values()), lambda: _jobs_payload(storage, **query)))
+    return _json_response(payload)
+
+
+@app.route('/api/stream')
+def api_stream():
+    """Push status and jobs to the browser whenever the database changes"""
+    query = _job_query_args()
+    storage = _get_storage()
+    # Each open stream holds a request thread; refuse once the slots are taken
+    # and the page falls back to polling
+    if _stream_slots is not None and not _stream_slots.acquire(blocking=False):
+        abort(503)
+    # Waitress reports a closed tab here; otherwise only a failed write notices it
+    disconnected = request.environ.get('waitress.client_disconnected', lambda: False)
     
-    jobs_data = []
-    for job in jobs:
-        job_dict = job.to_dict()
-        # Add computed fields for better display
-        job_dict['should_move_to_dlq'] = job.should_move_to_dlq()
-        job_dict['next_retry_in'] = job.get_next_retry_delay() if job.state == 'FAILED' else None
-        jobs_data.append(job_dict)
+    def generate(interval=1.0, keepalive=15.0):
+        last_version = None
+        idle = 0.0
+        for version in storage.iter_data_versions(interval):
+            if disconnected():
+                return
+            if version != last_version:
+                last_version = version
+                idle = 0.0
+                # Bypass the status cache so a pushed change is never stale
+                payload = _compute_status(storage)
+                payload.update(_jobs_payload(storage, **query))
+                yield b"data: " + dumps(payload) + b"\n\n"
+            else:
+                # Comment lines keep proxies from closing an idle stream
+                idle += interval
+                if idle >= keepalive:
+                    idle = 0.0
+                    yield b": keepalive\n\n"
     
-    return jsonify({'jobs': jobs_data})
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    if _stream_slots is not None:
+        response.call_on_close(_stream_slots.release)
+    return response
 
 
-def run_dashboard(host='127.0.0.1', port=5000, debug=False):
+def run_dashboard(host='127.0.0.1', port=5000, debug=False, use_reloader=False, threads=8):
     """Run the minimal dashboard server"""
+    global _stream_slots
     print(f"🚀 Starting QueueCTL Minimal Dashboard...")
     print(f"📊 Dashboard available at: http://{host}:{port}")
     print(f"⏹️  Press Ctrl+C to stop")
-    app.run(host=host, port=port, debug=debug)
+    
+    if not debug:
+        # Prefer a production WSGI server when installed; it runs on Windows too
+        try:
+            from waitress import serve
+        except ImportError:
+            pass
+        else:
+            # Keep one thread free for page loads and polls
+            _stream_slots = threading.BoundedSemaphore(threads - 1)
+            # Lookahead lets waitress notice a client that closed its stream
+            serve(app, host=host, port=port, threads=threads, channel_request_lookahead=1)
+            return
+    
+    app.run(host=host, port=port, debug=debug, use_reloader=use_reloader, threaded=True)
 
 
 if __name__ == '__main__':
@@ -1,21 +1,60 @@
 """Job model and data structures"""
 
-from dataclasses import dataclass, asdict
+from dataclasses import MISSING, dataclass, fields
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
-import json
+import sys
+from queuectl.jsonutil import loads, dumps
 
 
 class JobState:
     """Job state constants"""
+    __slots__ = ()
+
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
     DEAD = "dead"
 
+    ALL = (PENDING, PROCESSING, COMPLETED, FAILED, DEAD)
+
+    @staticmethod
+    def intern(state: str) -> str:
+        """Return the shared constant object for a state string"""
+        return _CANONICAL_STATES.get(state, state)
+
+
+_CANONICAL_STATES = {state: state for state in JobState.ALL}
+
+
+def format_timestamp(value: datetime) -> str:
+    """Format a naive UTC datetime in the stored ISO form with a 'Z' suffix"""
+    # Always write the microseconds: isoformat() drops them when they are zero,
+    # and 'Z' sorts after '.', which would break byte-order comparisons in SQL
+    return value.isoformat(timespec='microseconds') + "Z"
+
+
+def utc_now_iso() -> str:
+    """Get the current UTC time as a stored timestamp string"""
+    return format_timestamp(datetime.utcnow())
 
-@dataclass
+
+@lru_cache(maxsize=1024)
+def _parse_timestamp(value: str) -> datetime:
+    """Parse a stored UTC timestamp into a naive datetime, once per distinct string"""
+    # Timestamps are written as naive UTC plus a 'Z' suffix
+    if value.endswith('Z'):
+        value = value[:-1]
+    return datetime.fromisoformat(value)
+
+
+# Drop the per-instance __dict__ where dataclasses support it (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class Job:
     """Job data structure"""
     id: str
@@ -29,30 +68,48 @@ class Job:
     error_message: Optional[str] = None
 
     def __post_init__(self):
-        """Initialize timestamps if not provided"""
-        now = datetime.utcnow().isoformat() + "Z"
-        if self.created_at is None:
-            self.created_at = now
-        if self.updated_at is None:
-            self.updated_at = now
+        """Initialize timestamps if not provided and intern the state"""
+        # Share one string object per state, however the job was built
+        self.state = JobState.intern(self.state)
+        
+        # Jobs loaded from storage carry both timestamps, so skip the clock read
+        if self.created_at is None or self.updated_at is None:
+            now = utc_now_iso()
+            if self.created_at is None:
+                self.created_at = now
+            if self.updated_at is None:
+                self.updated_at = now
 
     def to_dict(self) -> dict:
         """Convert job to dictionary"""
-        return asdict(self)
+        # All fields are flat scalars, so skip asdict()'s recursive deep copy
+        return {
+            'id': self.id,
+            'command': self.command,
+            'state': self.state,
+            'attempts': self.attempts,
+            'max_retries': self.max_retries,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'next_retry_at': self.next_retry_at,
+            'error_message': self.error_message,
+        }
 
     def to_json(self) -> str:
-        """Convert job to JSON string"""
-        return json.dumps(self.to_dict(), indent=2)
+        """Convert job to compact JSON string"""
+        return dumps(self.to_dict()).decode()
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Job':
-        """Create job from dictionary"""
-        return cls(**data)
+        """Create job from dictionary, ignoring unknown keys"""
+        # Positional construction skips kwargs packing and tolerates extra columns
+        return cls(*[data[name] if default is MISSING else data.get(name, default)
+                     for name, default in _JOB_FIELDS])
 
     @classmethod
     def from_json(cls, json_str: str) -> 'Job':
         """Create job from JSON string"""
-        data = json.loads(json_str)
+        data = loads(json_str)
         return cls.from_dict(data)
 
     def can_retry(self) -> bool:
@@ -69,10 +126,13 @@ class Job:
             return None
         
         try:
-            next_retry = datetime.fromisoformat(self.next_retry_at.replace('Z', '+00:00'))
+            next_retry = _parse_timestamp(self.next_retry_at)
             now = datetime.utcnow()
             delay = (next_retry - now).total_seconds()
             return max(0, int(delay))
         except (ValueError, TypeError):
             return None
 
+
+# (name, default) per field in declaration order, for Job.from_dict
+_JOB_FIELDS = tuple((f.name, f.default) for f in fields(Job))
@@ -1,12 +1,88 @@
 """Persistent storage layer using SQLite"""
 
+import atexit
+import queue
 import sqlite3
 import json
 import os
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
-from queuectl.models import Job, JobState
+from typing import Any, Callable, Iterator, List, Optional
+from functools import lru_cache
+from itertools import chain, starmap
+from queuectl.models import Job, JobState, utc_now_iso
+
+
+# Re-applied on every connection; none of these persist in the database file
+_CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=10000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+
+# Job columns in Job field order, so rows map positionally onto the constructor
+_JOB_COLUMNS = ("id, command, state, attempts, max_retries, "
+                "created_at, updated_at, next_retry_at, error_message")
+
+# UPDATE ... RETURNING claims a job in one statement (SQLite 3.35+)
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Pending jobs first, then failed jobs due for retry, oldest first. Each branch
+# is its own LIMIT 1 lookup so the pending one walks idx_retry in created_at
+# order instead of sorting every runnable job on each claim.
+_NEXT_JOB_ID_SQL = """
+    SELECT COALESCE(
+        (SELECT id FROM jobs
+         WHERE state = ? AND next_retry_at IS NULL
+         ORDER BY created_at LIMIT 1),
+        (SELECT id FROM jobs
+         WHERE state = ? AND next_retry_at <= ? AND attempts < max_retries
+         ORDER BY created_at LIMIT 1)
+    )
+"""
+
+# Hot-path statements, shared so each connection's statement cache reuses them
+_INSERT_JOB_SQL = f"""
+    INSERT INTO jobs ({_JOB_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Rows per multi-row INSERT, within SQLite's bound-parameter limit
+# (32766 since 3.32, 999 before) at nine parameters per job
+_INSERT_BATCH_ROWS = 500 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999 // 9
+
+
+@lru_cache(maxsize=8)
+def _bulk_insert_sql(row_count: int) -> str:
+    """Build an INSERT OR IGNORE with one VALUES group per job"""
+    values = ", ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?)"] * row_count)
+    return f"INSERT OR IGNORE INTO jobs ({_JOB_COLUMNS}) VALUES {values}"
+
+
+_UPDATE_JOB_SQL = """
+    UPDATE jobs SET
+        command = ?, state = ?, attempts = ?, max_retries = ?,
+        updated_at = ?, next_retry_at = ?, error_message = ?
+    WHERE id = ?
+"""
+
+_CLAIM_JOB_SQL = f"""
+    UPDATE jobs SET state = ?, updated_at = ?
+    WHERE id = ({_NEXT_JOB_ID_SQL})
+    RETURNING {_JOB_COLUMNS}
+"""
+
+_SELECT_JOB_SQL = f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?"
+
+# Same predicate as Job.should_move_to_dlq, evaluated by SQLite
+_EXHAUSTED_WHERE = "WHERE state = ? AND attempts >= max_retries"
+
+# Writes that queue up while the writer is busy commit together, up to this many
+_WRITE_BATCH_SIZE = 64
 
 
 class Storage:
@@ -21,13 +97,135 @@ class Storage:
             db_path = str(db_dir / "jobs.db")
         
         self.db_path = db_path
+        # One persistent read connection per thread, closed when its thread exits
+        self._local = threading.local()
+        # All writes go through a single writer thread, started on first write
+        self._write_queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        atexit.register(self.close)
         self._init_db()
 
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection with the per-connection pragmas applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection and stop the writer thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+        
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._write_queue.put(None)
+            writer.join(timeout=5)
+
+    def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a write on the writer thread and return its result"""
+        future = Future()
+        # Enqueue under the lock so a dying writer cannot strand the write
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer.start()
+            self._write_queue.put((operation, future))
+        return future.result()
+
+    def _writer_loop(self):
+        """Apply queued writes until a None sentinel arrives"""
+        batch = []
+        try:
+            conn = self._open()
+            # Transactions are issued explicitly in _apply_writes
+            conn.isolation_level = None
+            try:
+                running = True
+                while running:
+                    batch = [self._write_queue.get()]
+                    # Drain what queued up meanwhile so it shares one commit
+                    while len(batch) < _WRITE_BATCH_SIZE and batch[-1] is not None:
+                        try:
+                            batch.append(self._write_queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    if batch[-1] is None:
+                        running = False
+                        batch.pop()
+                    if batch:
+                        self._apply_writes(conn, batch)
+            finally:
+                conn.close()
+        except BaseException as e:
+            self._fail_writes(batch, e)
+
+    def _fail_writes(self, batch: list, error: BaseException):
+        """Fail the current batch and every queued write when the writer thread dies"""
+        with self._writer_lock:
+            # The next write starts a fresh writer instead of queueing behind this one
+            self._writer = None
+            pending = list(batch)
+            while True:
+                try:
+                    pending.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+        for item in pending:
+            if item is not None and not item[1].done():
+                item[1].set_exception(error)
+
+    def _apply_writes(self, conn: sqlite3.Connection, batch: list):
+        """Run a batch of writes in one transaction, each isolated by a savepoint"""
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, future in batch:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    outcomes.append((future, operation(conn), None))
+                except Exception as e:
+                    # Undo only this write; the rest of the batch still commits
+                    conn.execute("ROLLBACK TO write_op")
+                    outcomes.append((future, None, e))
+                conn.execute("RELEASE write_op")
+            conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            finally:
+                # A failed ROLLBACK ends the writer, but these callers still hear why
+                for _, future in batch:
+                    future.set_exception(e)
+            return
+        
+        # Results are released only once the batch is durable
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
     def _init_db(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL persists in the database file and lets readers run alongside a writer
+        if self.db_path != ":memory:":
+            cursor.execute("PRAGMA journal_mode=WAL")
+        
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS jobs (
                 id TEXT PRIMARY KEY,
@@ -42,181 +240,254 @@ class Storage:
             )
         """)
         
+        # idx_state_created below serves every state lookup, including the
+        # GROUP BY in get_stats as a covering index, and idx_retry every
+        # next_retry_at lookup; drop the old single-column indexes so updates
+        # stop maintaining them
+        cursor.execute("DROP INDEX IF EXISTS idx_state")
+        cursor.execute("DROP INDEX IF EXISTS idx_next_retry")
+        
+        # Per-state listings read rows already in created_at order
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_state_created ON jobs(state, created_at)
+        """)
+        
+        # Unfiltered listings, e.g. the dashboard's newest jobs, skip the sort
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_state ON jobs(state)
+            CREATE INDEX IF NOT EXISTS idx_created ON jobs(created_at)
         """)
         
+        # Pending (next_retry_at IS NULL) and retry polls range-scan this index
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_next_retry ON jobs(next_retry_at)
+            CREATE INDEX IF NOT EXISTS idx_retry ON jobs(state, next_retry_at, created_at)
         """)
         
         conn.commit()
-        conn.close()
 
     def _job_from_row(self, row: tuple) -> Job:
         """Convert database row to Job object"""
-        return Job(
-            id=row[0],
-            command=row[1],
-            state=row[2],
-            attempts=row[3],
-            max_retries=row[4],
-            created_at=row[5],
-            updated_at=row[6],
-            next_retry_at=row[7],
-            error_message=row[8]
-        )
+        # Rows are selected as _JOB_COLUMNS, which matches Job's field order
+        return Job(*row)
 
     def add_job(self, job: Job) -> bool:
         """Add a new job"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        params = (
+            job.id, job.command, job.state, job.attempts, job.max_retries,
+            job.created_at, job.updated_at, job.next_retry_at, job.error_message
+        )
         
         try:
-            cursor.execute("""
-                INSERT INTO jobs (id, command, state, attempts, max_retries,
-                                created_at, updated_at, next_retry_at, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                job.id, job.command, job.state, job.attempts, job.max_retries,
-                job.created_at, job.updated_at, job.next_retry_at, job.error_message
-            ))
-            conn.commit()
+            self._write(lambda conn: conn.execute(_INSERT_JOB_SQL, params))
             return True
         except sqlite3.IntegrityError:
             # Job ID already exists
             return False
-        finally:
-            conn.close()
+
+    def add_jobs(self, jobs: List[Job]) -> int:
+        """Add multiple jobs in a single transaction, skipping existing IDs"""
+        rows = [(
+            job.id, job.command, job.state, job.attempts, job.max_retries,
+            job.created_at, job.updated_at, job.next_retry_at, job.error_message
+        ) for job in jobs]
+        
+        # One multi-row statement per chunk instead of a binding round-trip per job
+        def insert(conn):
+            inserted = 0
+            for start in range(0, len(rows), _INSERT_BATCH_ROWS):
+                chunk = rows[start:start + _INSERT_BATCH_ROWS]
+                # Ignored duplicates change no rows, so rowcount is the number inserted
+                inserted += conn.execute(_bulk_insert_sql(len(chunk)),
+                                         list(chain.from_iterable(chunk))).rowcount
+            return inserted
+        
+        return self._write(insert)
 
     def get_job(self, job_id: str) -> Optional[Job]:
         """Get job by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        cursor.execute(_SELECT_JOB_SQL, (job_id,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return self._job_from_row(row)
         return None
 
-    def update_job(self, job: Job) -> bool:
-        """Update existing job"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        job.updated_at = datetime.utcnow().isoformat() + "Z"
+    def update_job(self, job: Job, now: Optional[str] = None) -> bool:
+        """Update existing job, stamping it with now or the current time"""
+        job.updated_at = now or utc_now_iso()
         
-        cursor.execute("""
-            UPDATE jobs SET
-                command = ?, state = ?, attempts = ?, max_retries = ?,
-                updated_at = ?, next_retry_at = ?, error_message = ?
-            WHERE id = ?
-        """, (
+        params = (
             job.command, job.state, job.attempts, job.max_retries,
             job.updated_at, job.next_retry_at, job.error_message, job.id
-        ))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        )
+        return self._write(lambda conn: conn.execute(_UPDATE_JOB_SQL, params).rowcount) > 0
 
-    def get_jobs_by_state(self, state: str) -> List[Job]:
-        """Get all jobs with a specific state"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (state,))
-        rows = cursor.fetchall()
-        conn.close()
+    def get_jobs_by_state(self, state: str, limit: Optional[int] = None) -> List[Job]:
+        """Get jobs with a specific state, optionally capped at limit rows"""
+        return list(self.iter_jobs(state=state, limit=limit))
+
+    def iter_jobs(self, state: Optional[str] = None, limit: Optional[int] = None,
+                  newest_first: bool = False, batch_size: int = 500) -> Iterator[Job]:
+        """Yield jobs filtered by state and ordered by creation time, fetching rows in batches"""
+        # List-returning methods wrap this; iterate it directly to avoid holding every row
+        query = f"SELECT {_JOB_COLUMNS} FROM jobs"
+        params = []
+        if state is not None:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY created_at DESC LIMIT ?" if newest_first else " ORDER BY created_at LIMIT ?"
+        # SQLite treats a negative LIMIT as unbounded
+        params.append(-1 if limit is None else limit)
         
-        return [self._job_from_row(row) for row in rows]
+        cursor = self._connect().execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                # starmap drives Job(*row) from C, skipping a Python-level wrapper call per
+                # row; Job.__init__ and __post_init__ still run for each one
+                yield from starmap(Job, rows)
+        finally:
+            cursor.close()
 
     def get_pending_jobs(self, limit: int = 1) -> List[Job]:
         """Get pending jobs that are ready to be processed"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Get pending jobs (never processed, so next_retry_at should be NULL)
-        cursor.execute("""
-            SELECT * FROM jobs 
+        cursor.execute(f"""
+            SELECT {_JOB_COLUMNS} FROM jobs
             WHERE state = ? AND next_retry_at IS NULL
             ORDER BY created_at
             LIMIT ?
         """, (JobState.PENDING, limit))
         
         rows = cursor.fetchall()
-        conn.close()
         
-        return [self._job_from_row(row) for row in rows]
+        return list(starmap(Job, rows))
 
     def get_failed_jobs_ready_for_retry(self, limit: int = 1) -> List[Job]:
         """Get failed jobs that are ready for retry"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        now = datetime.utcnow().isoformat() + "Z"
+        now = utc_now_iso()
         
-        cursor.execute("""
-            SELECT * FROM jobs 
+        cursor.execute(f"""
+            SELECT {_JOB_COLUMNS} FROM jobs
             WHERE state = ? AND next_retry_at <= ? AND attempts < max_retries
             ORDER BY created_at
             LIMIT ?
         """, (JobState.FAILED, now, limit))
         
         rows = cursor.fetchall()
-        conn.close()
         
-        return [self._job_from_row(row) for row in rows]
+        return list(starmap(Job, rows))
 
-    def get_all_jobs(self) -> List[Job]:
-        """Get all jobs"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM jobs ORDER BY created_at")
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [self._job_from_row(row) for row in rows]
+    def get_all_jobs(self, limit: Optional[int] = None) -> List[Job]:
+        """Get all jobs, optionally capped at limit rows"""
+        return list(self.iter_jobs(limit=limit))
 
     def get_stats(self) -> dict:
         """Get job statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        stats = {}
-        for state in [JobState.PENDING, JobState.PROCESSING, JobState.COMPLETED, 
-                     JobState.FAILED, JobState.DEAD]:
-            cursor.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,))
-            stats[state] = cursor.fetchone()[0]
+        # One grouped scan of idx_state_created instead of a COUNT per state
+        cursor.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        counts = dict(cursor.fetchall())
         
-        conn.close()
-        return stats
+        return {state: counts.get(state, 0) for state in JobState.ALL}
 
-    def lock_job(self, job_id: str) -> bool:
-        """Try to lock a job for processing (prevent duplicate processing)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def data_version(self) -> int:
+        """Get the change counter as seen by the calling thread's connection"""
+        # Writes go through the writer connection, so they count as other commits here
+        return self._connect().execute("PRAGMA data_version").fetchone()[0]
+
+    def wait_for_change(self, version: int, timeout: float = 1.0, interval: float = 0.05,
+                        max_interval: float = 0.5) -> bool:
+        """Wait until the database changes after data_version() returned version"""
+        # data_version reads the shared WAL header, so polling it touches no table pages
+        deadline = time.monotonic() + timeout
+        while self.data_version() == version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            # Poll quickly right after activity, then back off while nothing changes
+            interval = min(interval * 2, max_interval)
+        return True
+
+    def iter_data_versions(self, interval: float = 1.0) -> Iterator[int]:
+        """Poll the database data_version, which changes when another connection commits"""
+        # A private connection, so commits made through this thread's one still count
+        conn = self._open()
+        try:
+            while True:
+                yield conn.execute("PRAGMA data_version").fetchone()[0]
+                time.sleep(interval)
+        finally:
+            conn.close()
+
+    def claim_next_job(self) -> Optional[Job]:
+        """Atomically move the next runnable job to processing and return it"""
+        now = utc_now_iso()
+        params = (JobState.PENDING, JobState.FAILED, now)
         
-        # Use a transaction to atomically check and update
-        cursor.execute("BEGIN IMMEDIATE")
+        # The writer's IMMEDIATE transaction makes the pick and the update atomic
+        def claim(conn):
+            if _HAS_RETURNING:
+                return conn.execute(_CLAIM_JOB_SQL, (JobState.PROCESSING, now) + params).fetchone()
+            row = conn.execute(_NEXT_JOB_ID_SQL, params).fetchone()
+            if row[0] is None:
+                return None
+            conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?",
+                         (JobState.PROCESSING, now, row[0]))
+            return conn.execute(_SELECT_JOB_SQL, (row[0],)).fetchone()
         
-        try:
+        row = self._write(claim)
+        if row:
+            return self._job_from_row(row)
+        return None
+
+    def move_exhausted_to_dlq(self) -> List[tuple]:
+        """Move failed jobs that used up their retries to the DLQ in one statement"""
+        now = utc_now_iso()
+        
+        def move(conn):
+            if _HAS_RETURNING:
+                return conn.execute(f"""
+                    UPDATE jobs SET state = ?, next_retry_at = NULL, updated_at = ?
+                    {_EXHAUSTED_WHERE}
+                    RETURNING id, max_retries
+                """, (JobState.DEAD, now, JobState.FAILED)).fetchall()
+            rows = conn.execute(f"SELECT id, max_retries FROM jobs {_EXHAUSTED_WHERE}",
+                                (JobState.FAILED,)).fetchall()
+            if rows:
+                conn.execute(f"""
+                    UPDATE jobs SET state = ?, next_retry_at = NULL, updated_at = ?
+                    {_EXHAUSTED_WHERE}
+                """, (JobState.DEAD, now, JobState.FAILED))
+            return rows
+        
+        # (id, max_retries) for each job moved
+        return self._write(move)
+
+    def lock_job(self, job_id: str) -> bool:
+        """Try to lock a job for processing (prevent duplicate processing)"""
+        # Runs inside the writer's transaction, so the check and update are atomic
+        def lock(conn):
             # Check if job is in a processable state
-            now = datetime.utcnow().isoformat() + "Z"
-            cursor.execute("""
+            now = utc_now_iso()
+            row = conn.execute("""
                 SELECT state, next_retry_at, attempts, max_retries FROM jobs WHERE id = ?
-            """, (job_id,))
-            row = cursor.fetchone()
+            """, (job_id,)).fetchone()
             
             if not row:
-                conn.rollback()
-                conn.close()
                 return False
             
             current_state, next_retry_at, attempts, max_retries = row
@@ -230,25 +501,18 @@ class Storage:
             elif current_state == JobState.FAILED:
                 # Failed jobs must be ready for retry
                 if next_retry_at is None or next_retry_at > now or attempts >= max_retries:
-                    conn.rollback()
-                    conn.close()
                     return False
             else:
                 # Not in a processable state
-                conn.rollback()
-                conn.close()
                 return False
             
             # Update to processing state
-            cursor.execute("""
+            conn.execute("""
                 UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?
             """, (JobState.PROCESSING, now, job_id))
-            
-            conn.commit()
-            conn.close()
             return True
+        
+        try:
+            return self._write(lock)
         except Exception:
-            conn.rollback()
-            conn.close()
             return False
-
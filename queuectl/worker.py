@@ -1,18 +1,96 @@
 """Worker manager for processing jobs"""
 
+import errno
+import locale
+import multiprocessing
+import shutil
 import subprocess
 import signal
 import sys
+import threading
 import time
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from queuectl.storage import Storage
-from queuectl.models import Job, JobState
+from queuectl.models import Job, JobState, format_timestamp
 from queuectl.config import Config
 
 
+# Characters /bin/sh would interpret; commands without any are exec'd directly
+_SHELL_CHARS = frozenset('|&;<>()$`\\"\'*?[]{}~#!=%\n')
+
+# POSIX sh builtins; some also exist in /usr/bin with different semantics
+# (dash's echo expands backslash escapes), so these always run through sh
+_SHELL_BUILTINS = frozenset({
+    '.', ':', 'alias', 'bg', 'break', 'cd', 'command', 'continue', 'echo', 'eval',
+    'exec', 'exit', 'export', 'false', 'fc', 'fg', 'getopts', 'hash', 'jobs', 'kill',
+    'newgrp', 'printf', 'pwd', 'read', 'readonly', 'return', 'set', 'shift', 'test',
+    'times', 'trap', 'true', 'type', 'ulimit', 'umask', 'unalias', 'unset', 'wait',
+})
+
+# Encoding text=True would have decoded command output with
+_OUTPUT_ENCODING = locale.getpreferredencoding(False)
+
+
+def _direct_argv(command: str) -> Optional[List[str]]:
+    """Split a command that needs no shell into argv, or return None"""
+    # Windows has no fork to avoid and cmd.exe builtins (echo, dir) need the shell
+    if os.name != 'posix' or not _SHELL_CHARS.isdisjoint(command):
+        return None
+    argv = command.split()
+    # Builtins keep using sh
+    if not argv or argv[0] in _SHELL_BUILTINS:
+        return None
+    return argv
+
+
+# Spawned (not forked) children start clean, without the parent's open SQLite
+# connections and writer thread, and behave the same on Windows and POSIX
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# Idle workers poll for changes at this interval, backing off to the maximum
+_POLL_INTERVAL = 0.05
+_MAX_POLL_INTERVAL = 0.5
+
+
+def _worker_main(db_path: str, config_dir: str, worker_id: int, stop_event):
+    """Entry point of a worker process"""
+    # Ctrl+C reaches the whole process group; the manager decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    # Connections cannot cross process boundaries, so each worker opens its own
+    storage = Storage(db_path)
+    worker = Worker(storage, Config(config_dir), worker_id=worker_id, stop_event=stop_event)
+    # The manager terminates workers that outlive the grace period; kill the
+    # running command so its job is recorded as failed instead of left processing
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker._terminate())
+    try:
+        worker._run()
+    finally:
+        storage.close()
+
+
+def default_pid_file() -> Path:
+    """Get the path of the worker PID file"""
+    return Path.home() / ".queuectl" / "workers.pid"
+
+
+def worker_is_running(pid_file: Optional[Path] = None) -> bool:
+    """Check whether the process recorded in the PID file is alive"""
+    if pid_file is None:
+        pid_file = default_pid_file()
+    try:
+        with open(pid_file, 'r') as f:
+            pid = int(f.read().strip())
+        # Signal 0 only checks that the process exists
+        os.kill(pid, 0)
+        return True
+    except (ValueError, IOError, ProcessLookupError):
+        return False
+
+
 class WorkerManager:
     """Manages worker processes"""
     
@@ -22,7 +100,7 @@ class WorkerManager:
         self.config = config
         self.workers = []
         self.running = False
-        self.pid_file = Path.home() / ".queuectl" / "workers.pid"
+        self.pid_file = default_pid_file()
         self._setup_signal_handlers()
 
     def _setup_signal_handlers(self):
@@ -100,9 +178,10 @@ class WorkerManager:
         for worker in self.workers:
             worker.stop()
         
-        # Wait for workers to complete
+        # Wait up to 30 seconds for current jobs to complete
+        deadline = time.monotonic() + 30
         for worker in self.workers:
-            worker.join(timeout=10)
+            worker.join(timeout=max(0, deadline - time.monotonic()))
         
         # Remove PID file
         if self.pid_file.exists():
@@ -116,70 +195,73 @@ class WorkerManager:
 
     def is_running(self) -> bool:
         """Check if workers are running"""
-        if self.pid_file.exists():
-            try:
-                with open(self.pid_file, 'r') as f:
-                    pid = int(f.read().strip())
-                # Check if process exists
-                os.kill(pid, 0)
-                return True
-            except (ValueError, IOError, ProcessLookupError):
-                return False
-        return False
+        return worker_is_running(self.pid_file)
 
 
 class Worker:
     """Individual worker process"""
     
-    def __init__(self, storage: Storage, config: Config, worker_id: int = 1):
+    def __init__(self, storage: Storage, config: Config, worker_id: int = 1, stop_event=None):
         """Initialize worker"""
         self.storage = storage
         self.config = config
         self.worker_id = worker_id
-        self.running = False
         self.current_job: Optional[Job] = None
         self.process: Optional[subprocess.Popen] = None
+        # In-process use (calling _run directly) stops on a plain thread event;
+        # start() swaps in one that crosses the process boundary
+        self._stop_event = stop_event if stop_event is not None else threading.Event()
+        self._terminating = False
+        self._worker_process = None
 
     def start(self):
-        """Start worker in a separate thread"""
-        import threading
-        self.running = True
-        thread = threading.Thread(target=self._run, daemon=True)
-        thread.start()
+        """Start worker in a separate process"""
+        self._stop_event = _MP_CONTEXT.Event()
+        self._worker_process = _MP_CONTEXT.Process(
+            target=_worker_main,
+            args=(self.storage.db_path, str(self.config.config_dir), self.worker_id, self._stop_event),
+            daemon=True
+        )
+        self._worker_process.start()
+
+    def _should_stop(self) -> bool:
+        """Check for a stop request or a manager process that has gone away"""
+        if self._terminating or self._stop_event.is_set():
+            return True
+        # A force-killed manager cannot signal its children, so watch it directly
+        parent = getattr(multiprocessing, 'parent_process', lambda: None)()
+        return parent is not None and not parent.is_alive()
 
     def _run(self):
         """Main worker loop"""
-        while self.running:
+        poll_interval = _POLL_INTERVAL
+        while not self._should_stop():
             try:
+                # Read the change counter first so a commit during the poll still wakes us
+                version = self.storage.data_version()
+                
                 # Try to get a job
                 job = self._get_next_job()
                 
                 if job:
                     self._process_job(job)
+                    poll_interval = _POLL_INTERVAL
                 else:
-                    # No jobs available, wait a bit
-                    time.sleep(1)
+                    # No jobs available; wake on the next commit, or after 1s for retry deadlines
+                    changed = self.storage.wait_for_change(version, timeout=1.0, interval=poll_interval,
+                                                           max_interval=_MAX_POLL_INTERVAL)
+                    # A quiet second keeps the slow interval until the database changes
+                    poll_interval = _POLL_INTERVAL if changed else _MAX_POLL_INTERVAL
             except Exception as e:
                 print(f"Worker {self.worker_id} error: {e}", file=sys.stderr)
                 time.sleep(1)
 
     def _get_next_job(self) -> Optional[Job]:
         """Get next job to process (with locking)"""
-        # First try pending jobs
-        jobs = self.storage.get_pending_jobs(limit=10)
-        
-        for job in jobs:
-            if self.storage.lock_job(job.id):
-                # Successfully locked, refresh from DB
-                return self.storage.get_job(job.id)
-        
-        # Then try failed jobs ready for retry
-        jobs = self.storage.get_failed_jobs_ready_for_retry(limit=10)
-        
-        for job in jobs:
-            if self.storage.lock_job(job.id):
-                # Successfully locked, refresh from DB
-                return self.storage.get_job(job.id)
+        # Pending jobs first, then failed jobs ready for retry, claimed in one statement
+        job = self.storage.claim_next_job()
+        if job is not None:
+            return job
         
         # Finally, handle failed jobs that have exhausted retries and should move to DLQ
         self._process_exhausted_retry_jobs()
@@ -188,16 +270,9 @@ class Worker:
 
     def _process_exhausted_retry_jobs(self):
         """Process failed jobs that have exhausted retries and should move to DLQ"""
-        failed_jobs = self.storage.get_jobs_by_state(JobState.FAILED)
-        
-        for job in failed_jobs:
-            if job.should_move_to_dlq():
-                # Move to DLQ
-                job.state = JobState.DEAD
-                job.next_retry_at = None
-                job.updated_at = datetime.utcnow().isoformat() + "Z"
-                self.storage.update_job(job)
-                print(f"Worker {self.worker_id}: Job {job.id} moved to DLQ after exhausting {job.max_retries} retries")
+        # A single UPDATE in SQLite; failed jobs are no longer loaded into Python
+        for job_id, max_retries in self.storage.move_exhausted_to_dlq():
+            print(f"Worker {self.worker_id}: Job {job_id} moved to DLQ after exhausting {max_retries} retries")
 
     def _process_job(self, job: Job):
         """Process a single job"""
@@ -208,11 +283,15 @@ class Worker:
             # Execute command
             result = self._execute_command(job.command)
             
+            # One clock read covers both the backoff deadline and updated_at
+            now = datetime.utcnow()
+            stamp = format_timestamp(now)
+            
             if result['success']:
                 # Job completed successfully
                 job.state = JobState.COMPLETED
                 job.error_message = None
-                self.storage.update_job(job)
+                self.storage.update_job(job, now=stamp)
                 print(f"Worker {self.worker_id}: Job {job.id} completed successfully")
             else:
                 # Job failed
@@ -223,22 +302,22 @@ class Worker:
                     # Move to DLQ
                     job.state = JobState.DEAD
                     job.next_retry_at = None
-                    self.storage.update_job(job)
+                    self.storage.update_job(job, now=stamp)
                     print(f"Worker {self.worker_id}: Job {job.id} moved to DLQ after {job.attempts} attempts")
                 else:
                     # Schedule retry with exponential backoff
                     backoff_base = self.config.get("backoff_base", 2)
                     delay_seconds = backoff_base ** job.attempts
-                    next_retry = datetime.utcnow() + timedelta(seconds=delay_seconds)
-                    job.next_retry_at = next_retry.isoformat() + "Z"
+                    job.next_retry_at = format_timestamp(now + timedelta(seconds=delay_seconds))
                     job.state = JobState.FAILED
-                    self.storage.update_job(job)
+                    self.storage.update_job(job, now=stamp)
                     print(f"Worker {self.worker_id}: Job {job.id} failed, will retry in {delay_seconds}s (attempt {job.attempts}/{job.max_retries})")
         
         except Exception as e:
             # Unexpected error
             job.attempts += 1
             job.error_message = str(e)
+            now = datetime.utcnow()
             
             if job.should_move_to_dlq():
                 job.state = JobState.DEAD
@@ -246,11 +325,10 @@ class Worker:
             else:
                 backoff_base = self.config.get("backoff_base", 2)
                 delay_seconds = backoff_base ** job.attempts
-                next_retry = datetime.utcnow() + timedelta(seconds=delay_seconds)
-                job.next_retry_at = next_retry.isoformat() + "Z"
+                job.next_retry_at = format_timestamp(now + timedelta(seconds=delay_seconds))
                 job.state = JobState.FAILED
             
-            self.storage.update_job(job)
+            self.storage.update_job(job, now=format_timestamp(now))
             print(f"Worker {self.worker_id}: Error processing job {job.id}: {e}", file=sys.stderr)
         
         finally:
@@ -259,20 +337,49 @@ class Worker:
     def _execute_command(self, command: str) -> dict:
         """Execute a shell command"""
         try:
-            # Use shell=True to support complex commands
-            # timeout can be added as a bonus feature
-            process = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            argv = _direct_argv(command)
+            # Looked up per job, so programs installed or moved later are seen;
+            # names with no executable on PATH (exit, export, ...) keep using sh
+            executable = shutil.which(argv[0]) if argv is not None else None
+            process = None
+            if executable is not None:
+                # Exec simple commands without /bin/sh; an absolute executable and
+                # close_fds=False let CPython use posix_spawn instead of fork+exec
+                # (Python's own descriptors are non-inheritable, so nothing leaks)
+                try:
+                    process = subprocess.Popen(
+                        argv,
+                        executable=executable,
+                        close_fds=False,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE
+                    )
+                except OSError as e:
+                    # sh runs a script without a shebang line itself, and looks the
+                    # name up again if the executable vanished; leave both to sh
+                    if e.errno not in (errno.ENOEXEC, errno.ENOENT):
+                        raise
+            if process is None:
+                # Use shell=True to support complex commands
+                # timeout can be added as a bonus feature
+                process = subprocess.Popen(
+                    command,
+                    shell=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
             
             self.process = process
+            # A termination that arrived before the command started still ends it
+            if self._terminating:
+                process.kill()
             stdout, stderr = process.communicate()
             exit_code = process.returncode
             
+            # Decode once here rather than through a text-mode wrapper per pipe
+            stdout = stdout.decode(_OUTPUT_ENCODING, errors='replace')
+            stderr = stderr.decode(_OUTPUT_ENCODING, errors='replace')
+            
             self.process = None
             
             if exit_code == 0:
@@ -304,20 +411,25 @@ class Worker:
 
     def stop(self):
         """Stop worker gracefully"""
-        self.running = False
-        
-        # If processing a job, wait for it to complete
-        if self.current_job and self.process:
-            try:
-                # Wait up to 30 seconds for job to complete
-                self.process.wait(timeout=30)
-            except subprocess.TimeoutExpired:
-                # Force kill if timeout
-                self.process.kill()
-                self.process.wait()
+        # The worker process finishes its current job, then exits its loop
+        self._stop_event.set()
+
+    def _terminate(self):
+        """Kill the running command and exit the loop (SIGTERM handler)"""
+        self._terminating = True
+        if self.process is not None:
+            self.process.kill()
 
     def join(self, timeout: Optional[float] = None):
-        """Wait for worker to finish (thread join)"""
-        # This is handled by the thread, but we can add a small delay
-        time.sleep(0.1)
+        """Wait for the worker process to exit, killing it after timeout"""
+        if self._worker_process is None:
+            return
+        self._worker_process.join(timeout)
+        if self._worker_process.is_alive():
+            # SIGTERM makes the worker kill its command and record the job as failed
+            self._worker_process.terminate()
+            self._worker_process.join(5)
+        if self._worker_process.is_alive():
+            self._worker_process.kill()
+            self._worker_process.join()
 
@@ -10,6 +10,10 @@ setup(
         "click>=8.1.0",
         "python-dateutil>=2.8.2",
     ],
+    extras_require={
+        "fast": ["orjson>=3.9.0"],
+        "server": ["waitress>=2.1.0"],
+    },
     entry_points={
         "console_scripts": [
             "queuectl=queuectl.cli:main",